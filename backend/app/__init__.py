@@ -48,6 +48,11 @@ def create_app(config_name='development'):
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(assistant_bp, url_prefix='/api/assistant')
 
+    # Optionally pre-load the chat model in the background once the server handles its first request
+    if app.config.get('OLLAMA_WARMUP'):
+        from .assistant.llm_interface import register_warm_up
+        register_warm_up(app)
+
     @app.route('/api/hello') # Example basic route
     def hello():
         return "Hello from Nexus Backend!"
@@ -43,10 +43,10 @@ def chat():
 
             # --- Implement Streaming Response & DB Save ---
             def generate():
-                full_response = ""
+                response_chunks = [] # Joined once at the end instead of re-concatenating per chunk
                 try:
                     for chunk in response_generator:
-                        full_response += chunk
+                        response_chunks.append(chunk)
                         # Format chunk according to desired streaming protocol (e.g., SSE)
                         yield f"data: {json.dumps({'response_chunk': chunk})}\n\n"
                     # Optionally send a final 'done' message
@@ -57,20 +57,20 @@ def chat():
                     with current_app.app_context():
                         try:
                             if initial_turn:
-                                initial_turn.assistant_response = full_response
+                                initial_turn.assistant_response = "".join(response_chunks)
                                 db.session.add(initial_turn) # Add the updated turn object
                                 db.session.commit()
-                                current_app.logger.info(f"Saved streamed conversation turn ID {initial_turn.id} to DB.")
+                                current_app.logger.info("Saved streamed conversation turn ID %s to DB.", initial_turn.id)
                             else:
                                 current_app.logger.error("Initial turn object was None, cannot save streamed response.")
                         except Exception as db_err:
-                            current_app.logger.error(f"Failed to save streamed conversation turn to DB: {db_err}", exc_info=True)
+                            current_app.logger.error("Failed to save streamed conversation turn to DB: %s", db_err, exc_info=True)
                             db.session.rollback()
                     # --- End DB Save ---
 
                 except Exception as e:
                     # Log error during streaming generation
-                    current_app.logger.error(f"Error during assistant response streaming generation: {e}", exc_info=True)
+                    current_app.logger.error("Error during assistant response streaming generation: %s", e, exc_info=True)
                     # Send an error message through the stream if possible
                     yield f"data: {json.dumps({'error': 'Streaming failed during generation'})}\n\n"
                     # Also attempt to rollback DB if initial_turn exists but saving failed before this point
@@ -85,5 +85,5 @@ def chat():
 
     except Exception as e:
         # Log the exception properly in a real app
-        current_app.logger.error(f"Error in assistant chat endpoint: {e}", exc_info=True)
+        current_app.logger.error("Error in assistant chat endpoint: %s", e, exc_info=True)
         return jsonify({"error": "An internal error occurred processing your request"}), 500
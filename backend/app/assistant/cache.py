@@ -0,0 +1,50 @@
+# backend/app/assistant/cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+def canonical_key(*parts):
+    """
+    Builds a stable, compact cache key from JSON-serializable parts.
+    Dicts are serialized with sorted keys, so logically equal arguments
+    (e.g. metadata filters built in a different order) map to the same key.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # { key: (expires_at, value) }, oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for key, or None on miss/expiry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() > expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """Stores value (optionally with its own ttl), evicting the least recently used entries beyond maxsize."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drops all entries."""
+        with self._lock:
+            self._data.clear()
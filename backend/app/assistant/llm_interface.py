@@ -1,10 +1,123 @@
 # backend/app/assistant/llm_interface.py
 import ollama
+import httpx # Transport used by the ollama client (declared in requirements.txt since we use it directly)
 from flask import current_app # To access config like OLLAMA_URL
 import logging
+import random
+import threading
+import time
+from .cache import TTLCache, canonical_key
 
 logger = logging.getLogger(__name__)
 
+# Exact-match cache for non-streamed responses (enabled via LLM_RESPONSE_CACHE_TTL)
+LLM_RESPONSE_CACHE_SIZE = 256
+_response_cache = TTLCache(maxsize=LLM_RESPONSE_CACHE_SIZE, ttl=0)
+
+# Retry policy for non-streamed chat calls (full-jitter exponential backoff)
+LLM_MAX_ATTEMPTS = 3
+LLM_RETRY_BASE_DELAY = 0.25 # seconds
+LLM_RETRY_MAX_DELAY = 4 # seconds
+# HTTP statuses from Ollama worth retrying (busy / overloaded / restarting)
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+def backoff_delay(attempt: int, base: float, cap: float):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def is_transient_error(e: Exception):
+    """
+    True for failures a quick retry can fix: connection drops/refusals and 429/5xx responses.
+    Read timeouts are not retried, since a generation that timed out will most likely time out again.
+    """
+    if isinstance(e, ollama.ResponseError):
+        return e.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(e, (ConnectionError, httpx.ConnectError, httpx.RemoteProtocolError))
+
+def is_permanent_error(e: Exception):
+    """
+    True for client-side errors from Ollama (e.g. 404 model not found, 400 bad request)
+    that will fail the same way on every retry.
+    """
+    return isinstance(e, ollama.ResponseError) and 400 <= e.status_code < 500 and e.status_code not in TRANSIENT_STATUS_CODES
+
+def _chat_with_retries(client, llm_model, messages, keep_alive=None):
+    """Non-streamed chat call, retried with jittered backoff on transient failures."""
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        try:
+            return client.chat(model=llm_model, messages=messages, stream=False, keep_alive=keep_alive)
+        except Exception as e:
+            if attempt + 1 >= LLM_MAX_ATTEMPTS or not is_transient_error(e):
+                raise
+            delay = backoff_delay(attempt, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY)
+            logger.warning("Ollama chat attempt %d failed (%s); retrying in %.2fs", attempt + 1, e, delay)
+            time.sleep(delay)
+
+# One process-wide ollama.Client (and pooled HTTP connection) per host, shared by chat and embeddings
+# Pool sizing: idle connections are kept well beyond httpx's 5s default, since chat turns are
+# usually further apart than that and would otherwise reconnect every time.
+OLLAMA_POOL_MAX_CONNECTIONS = 20
+OLLAMA_POOL_MAX_KEEPALIVE = 10
+OLLAMA_POOL_KEEPALIVE_EXPIRY = 60 # seconds
+# Connecting (and waiting for a pooled connection) is bounded even when OLLAMA_TIMEOUT is unset,
+# so an unreachable server fails fast instead of hanging a request worker
+OLLAMA_CONNECT_TIMEOUT = 10 # seconds
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_ollama_client(host: str, timeout: float = None):
+    """Returns the shared ollama.Client for host/timeout (None = no read timeout), creating it on first use."""
+    key = (host, timeout)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                limits = httpx.Limits(
+                    max_connections=OLLAMA_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=OLLAMA_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=OLLAMA_POOL_KEEPALIVE_EXPIRY
+                )
+                timeouts = httpx.Timeout(timeout, connect=OLLAMA_CONNECT_TIMEOUT, pool=OLLAMA_CONNECT_TIMEOUT)
+                client = ollama.Client(host=host, timeout=timeouts, limits=limits) # Extra kwargs go to httpx.Client
+                _clients[key] = client
+    return client
+
+def warm_up_llm(app):
+    """
+    Loads the default chat model into Ollama and opens the pooled connection in a
+    background thread, so the first user request doesn't pay the model load time.
+    Failures are only logged; the app starts normally if Ollama is unavailable.
+    """
+    def _warm_up():
+        llm_model = app.config['OLLAMA_DEFAULT_MODEL']
+        try:
+            client = get_ollama_client(app.config['OLLAMA_URL'], app.config['OLLAMA_TIMEOUT'])
+            client.generate(model=llm_model, prompt='', keep_alive=app.config.get('OLLAMA_KEEP_ALIVE')) # An empty prompt just loads the model
+            logger.info("Warmed up Ollama model: %s", llm_model)
+        except Exception as e:
+            logger.warning("Ollama warm-up for model '%s' failed: %s", llm_model, e)
+
+    threading.Thread(target=_warm_up, name="ollama-warmup", daemon=True).start()
+
+def register_warm_up(app):
+    """
+    Starts warm_up_llm once, when the app handles its first request. Doing it on the first
+    request (rather than in create_app) means only the process that actually serves requests
+    loads the model, whichever launcher is used; CLI commands and the debug reloader's parent never do.
+    """
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _warm_up_once():
+        if started.is_set():
+            return
+        with start_lock:
+            if not started.is_set():
+                started.set()
+                warm_up_llm(app)
+
 def get_llm_response(messages, model=None, stream=False):
     """
     Gets a response from the configured Ollama LLM.
@@ -15,6 +128,8 @@ def get_llm_response(messages, model=None, stream=False):
                           {'role': 'user', 'content': '...'}]
         model (str, optional): Override the default model from config.
         stream (bool): Whether to stream the response.
+                       Non-streamed responses may be served from the exact-match
+                       response cache when LLM_RESPONSE_CACHE_TTL > 0.
 
     Returns:
         If stream=False: The full response content (str).
@@ -22,33 +137,50 @@ def get_llm_response(messages, model=None, stream=False):
         Raises Exception on API error.
     """
     try:
-        client = ollama.Client(host=current_app.config['OLLAMA_URL'])
+        client = get_ollama_client(current_app.config['OLLAMA_URL'], current_app.config['OLLAMA_TIMEOUT'])
         llm_model = model or current_app.config['OLLAMA_DEFAULT_MODEL']
-        logger.info(f"Sending request to Ollama model: {llm_model} at {current_app.config['OLLAMA_URL']}")
+        keep_alive = current_app.config.get('OLLAMA_KEEP_ALIVE')
+        cache_ttl = current_app.config.get('LLM_RESPONSE_CACHE_TTL', 0)
+        cache_key = None
+        if not stream and cache_ttl > 0:
+            cache_key = canonical_key(llm_model, messages)
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving cached response for Ollama model: %s", llm_model)
+                return cached
+        logger.info("Sending request to Ollama model: %s at %s", llm_model, current_app.config['OLLAMA_URL'])
         # logger.debug(f"Ollama Request Messages: {messages}") # Be careful logging full prompts
 
-        response = client.chat(
-            model=llm_model,
-            messages=messages,
-            stream=stream
-        )
+        if stream:
+            # Streamed responses can't be retried transparently once chunks reach the caller
+            response = client.chat(
+                model=llm_model,
+                messages=messages,
+                stream=True,
+                keep_alive=keep_alive
+            )
+        else:
+            response = _chat_with_retries(client, llm_model, messages, keep_alive=keep_alive)
 
         if stream:
             # Generator yielding message content chunks
             def generate():
-                full_response_for_log = ""
+                # Only keep the chunks around if the full response will actually be logged
+                chunks_for_log = [] if logger.isEnabledFor(logging.DEBUG) else None
                 try:
                     for chunk in response:
                         # Check if chunk is valid and has content
                         if isinstance(chunk, dict) and 'message' in chunk and 'content' in chunk['message']:
                             content_chunk = chunk['message']['content']
-                            full_response_for_log += content_chunk
+                            if chunks_for_log is not None:
+                                chunks_for_log.append(content_chunk)
                             yield content_chunk # Yield only the text content part
                         else:
-                            logger.warning(f"Received unexpected chunk format from Ollama stream: {chunk}")
-                    logger.debug(f"Ollama Streamed Response (Full): {full_response_for_log}")
+                            logger.warning("Received unexpected chunk format from Ollama stream: %s", chunk)
+                    if chunks_for_log is not None:
+                        logger.debug("Ollama Streamed Response (Full): %s", "".join(chunks_for_log))
                 except Exception as e:
-                    logger.error(f"Error processing Ollama stream chunk: {e}", exc_info=True)
+                    logger.error("Error processing Ollama stream chunk: %s", e, exc_info=True)
                     # Decide if you want to yield an error message or just stop
                     yield "[Error processing stream]" # Example error yield
             return generate()
@@ -56,14 +188,16 @@ def get_llm_response(messages, model=None, stream=False):
             # Handle non-streaming response
             if isinstance(response, dict) and 'message' in response and 'content' in response['message']:
                  response_content = response['message']['content']
-                 logger.debug(f"Ollama Response (Full): {response_content}")
+                 logger.debug("Ollama Response (Full): %s", response_content)
+                 if cache_key is not None:
+                     _response_cache.set(cache_key, response_content, ttl=cache_ttl)
                  return response_content
             else:
-                 logger.error(f"Received unexpected response format from Ollama (non-stream): {response}")
+                 logger.error("Received unexpected response format from Ollama (non-stream): %s", response)
                  raise ValueError("Invalid response format received from Ollama.")
 
 
     except Exception as e:
-        logger.error(f"Error connecting to Ollama ({current_app.config['OLLAMA_URL']}) or during generation: {e}", exc_info=True)
+        logger.error("Error connecting to Ollama (%s) or during generation: %s", current_app.config['OLLAMA_URL'], e, exc_info=True)
         # Log the error properly
         raise # Re-raise the exception to be handled by the caller (e.g., the API route)
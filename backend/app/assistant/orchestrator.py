@@ -3,7 +3,7 @@ from .llm_interface import get_llm_response
 from .rag.retriever import retrieve_context
 # Adjust tool import based on final structure in tools/__init__.py
 from .tools import get_tool, get_tool_descriptions
-from .prompt_templates import SYSTEM_PROMPT, RAG_PROMPT_TEMPLATE, BASIC_CHAT_TEMPLATE, format_history_ollama, format_history_string
+from .prompt_templates import format_system_prompt, RAG_USER_PROMPT_TEMPLATE, BASIC_CHAT_TEMPLATE, format_history_ollama, format_history_string
 from app.models import ConversationTurn # To save history
 from app import db
 from flask import current_app
@@ -33,16 +33,17 @@ def load_history_from_db(user_id: int, session_id: str = None, limit: int = 5):
         # Reverse the list to get chronological order (oldest first)
         turns.reverse()
 
-        history_tuples = []
-        for turn in turns:
-            if turn.user_message:
-                history_tuples.append(("user", turn.user_message))
-            if turn.assistant_response:
-                history_tuples.append(("assistant", turn.assistant_response))
-        logger.info(f"Loaded {len(turns)} turns from DB for user {user_id}, session {session_id}")
+        # One pass over the turns; each turn contributes its non-empty user/assistant messages
+        history_tuples = [
+            (role, content)
+            for turn in turns
+            for role, content in (("user", turn.user_message), ("assistant", turn.assistant_response))
+            if content
+        ]
+        logger.info("Loaded %d turns from DB for user %s, session %s", len(turns), user_id, session_id)
         return history_tuples
     except Exception as e:
-        logger.error(f"Failed to load history from DB: {e}", exc_info=True)
+        logger.error("Failed to load history from DB: %s", e, exc_info=True)
         return [] # Return empty list on error
 
 
@@ -51,7 +52,7 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
     Main pipeline for processing user message with RAG and potential tools.
     (This is a simplified example)
     """
-    logger.info(f"Running pipeline for User {user_id}, Session: {session_id}, Stream: {stream}, Message: '{user_message[:100]}...'")
+    logger.info("Running pipeline for User %s, Session: %s, Stream: %s, Message: '%.100s...'", user_id, session_id, stream, user_message)
 
     # --- 1. Load History from DB ---
     history = load_history_from_db(user_id, session_id, limit=5) # Load last 5 turns
@@ -60,17 +61,17 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
     try:
         # TODO: Add logic to decide IF RAG is needed based on query/history
         context_docs = retrieve_context(user_message, top_k=2) # Get top 2 relevant docs
-        retrieved_context_str = "\n---\n".join([doc for doc in context_docs]) # Simple join for now
-        logger.debug(f"Retrieved Context:\n{retrieved_context_str}")
+        retrieved_context_str = "\n---\n".join(context_docs) # Simple join for now
+        logger.debug("Retrieved Context:\n%s", retrieved_context_str)
     except Exception as e:
-        logger.error(f"RAG retrieval failed: {e}", exc_info=True)
+        logger.error("RAG retrieval failed: %s", e, exc_info=True)
         retrieved_context_str = "Context retrieval failed."
         # Decide if you want to halt or proceed without context
 
     # --- 3. Prepare Prompt ---
     # Get available tool descriptions
     tool_descriptions = get_tool_descriptions()
-    formatted_system_prompt = SYSTEM_PROMPT.format(tool_descriptions=tool_descriptions or "No tools available.")
+    formatted_system_prompt = format_system_prompt(tool_descriptions)
 
     # Format history for the LLM (Ollama format)
     formatted_history_list = format_history_ollama(history)
@@ -79,27 +80,19 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
     # If we have context and it wasn't an error, use the RAG template
     use_rag_template = bool(retrieved_context_str and retrieved_context_str != "Context retrieval failed.")
 
-    # Create the messages list for Ollama
-    messages = []
-    messages.append({"role": "system", "content": formatted_system_prompt})
-
-    # Add formatted history (if any)
-    if formatted_history_list:
-        messages.extend(formatted_history_list)
+    # Create the messages list for Ollama: system prompt followed by formatted history (if any)
+    messages = [{"role": "system", "content": formatted_system_prompt}, *formatted_history_list]
 
     # Add the final user query, potentially incorporating context via the template structure
     if use_rag_template:
         # Format history as a string for insertion into the RAG template's history section
         history_str_for_template = format_history_string(history)
-        final_user_prompt = RAG_PROMPT_TEMPLATE.format(
-            system_prompt="", # System prompt is already a separate message
+        # System prompt is already a separate message, so use the template variant without it
+        final_user_prompt = RAG_USER_PROMPT_TEMPLATE.format(
             retrieved_context=retrieved_context_str,
             history=history_str_for_template,
             user_query=user_message
         )
-        # Remove the initial system prompt part from the template if it was included
-        final_user_prompt = final_user_prompt.split("Conversation History (Oldest to Newest):", 1)[-1]
-        final_user_prompt = f"Conversation History (Oldest to Newest):{final_user_prompt}" # Add back the header
     else:
         # Use basic chat template structure or just the user message if no history
         if history:
@@ -113,7 +106,7 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
 
     # Append the final constructed user message
     messages.append({"role": "user", "content": final_user_prompt})
-    logger.debug(f"Final prompt messages structure for LLM: {messages}")
+    logger.debug("Final prompt messages structure for LLM: %s", messages) # Lazy: the repr of the full prompt is only built if DEBUG is on
 
     # --- 4. Call LLM & Handle Potential Tool Use ---
     try:
@@ -192,10 +185,10 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
 
         # If not streaming, response_data is the full string
         assistant_response = response_data
-        logger.debug(f"LLM Response (non-stream): {assistant_response}")
+        logger.debug("LLM Response (non-stream): %s", assistant_response)
 
     except Exception as e:
-        logger.error(f"LLM generation failed: {e}", exc_info=True)
+        logger.error("LLM generation failed: %s", e, exc_info=True)
         assistant_response = "Sorry, I encountered an error trying to generate a response."
         # If streaming was requested, we can't easily return an error generator here
         # The exception should propagate to the route handler.
@@ -216,9 +209,9 @@ def run_assistant_pipeline(user_id: int, user_message: str, session_id: str = No
             )
             db.session.add(turn)
             db.session.commit()
-            logger.info(f"Saved non-streamed conversation turn ID {turn.id} to DB.")
+            logger.info("Saved non-streamed conversation turn ID %s to DB.", turn.id)
         except Exception as e:
-            logger.error(f"Failed to save conversation turn to DB: {e}", exc_info=True)
+            logger.error("Failed to save conversation turn to DB: %s", e, exc_info=True)
             db.session.rollback() # Important to roll back on error
 
     # Return the final response (string if not streaming, tuple if streaming)
@@ -1,5 +1,6 @@
 # backend/app/assistant/prompt_templates.py
 import logging
+import functools
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +16,13 @@ Available Tools:
 {tool_descriptions}
 """
 
-# Example template incorporating RAG context
-RAG_PROMPT_TEMPLATE = """{system_prompt}
+@functools.lru_cache(maxsize=8)
+def format_system_prompt(tool_descriptions: str):
+    """Fills SYSTEM_PROMPT with the tool list (cached, since the tool registry is fixed after import)."""
+    return SYSTEM_PROMPT.format(tool_descriptions=tool_descriptions or "No tools available.")
 
-Relevant Context Retrieved:
+# User-turn RAG template for chat APIs, where the system prompt is sent as its own message
+RAG_USER_PROMPT_TEMPLATE = """Relevant Context Retrieved:
 ---
 {retrieved_context}
 ---
@@ -29,6 +33,9 @@ Conversation History (Oldest to Newest):
 User Query: {user_query}
 Assistant Response:"""
 
+# Example template incorporating RAG context (single-prompt variant of RAG_USER_PROMPT_TEMPLATE)
+RAG_PROMPT_TEMPLATE = "{system_prompt}\n\n" + RAG_USER_PROMPT_TEMPLATE
+
 # Simpler template if not using RAG or tools initially
 BASIC_CHAT_TEMPLATE = """{system_prompt}
 
@@ -38,21 +45,22 @@ Conversation History (Oldest to Newest):
 User Query: {user_query}
 Assistant Response:"""
 
+# Roles accepted in history messages sent to Ollama's /api/chat
+_VALID_ROLES = frozenset({'user', 'assistant', 'system'})
+
 # Function to format history for Ollama (list of dicts)
 def format_history_ollama(history_tuples):
     """
     Formats conversation history from [(role, message), ...] tuples
     into the list of dictionaries format expected by Ollama's /api/chat.
     """
-    messages = []
     if not history_tuples:
-        return messages
-    for role, content in history_tuples:
-        # Ensure role is either 'user' or 'assistant' (or 'system' if applicable)
-        if role not in ['user', 'assistant', 'system']:
-             logger.warning(f"Invalid role '{role}' found in history tuple, skipping.")
-             continue
-        messages.append({"role": role, "content": content})
+        return []
+    # Single pass; entries with unexpected roles are dropped
+    messages = [{"role": role, "content": content} for role, content in history_tuples if role in _VALID_ROLES]
+    if len(messages) != len(history_tuples):
+        invalid_roles = sorted({str(role) for role, _ in history_tuples if role not in _VALID_ROLES})
+        logger.warning("Skipped %d history entries with invalid roles: %s", len(history_tuples) - len(messages), invalid_roles)
     return messages
 
 # Function to format history as a simple string (for basic templates)
@@ -60,10 +68,7 @@ def format_history_string(history_tuples):
     """Formats history into a simple alternating string."""
     if not history_tuples:
         return "No previous conversation history."
-    history_str = ""
-    for role, content in history_tuples:
-         # Capitalize role for readability
-        history_str += f"{role.capitalize()}: {content}\n"
-    return history_str.strip()
+    # Single join instead of repeated string concatenation; role capitalized for readability
+    return "\n".join(f"{role.capitalize()}: {content}" for role, content in history_tuples).strip()
 
 # You might add more specific templates here, e.g., for tool use decision making
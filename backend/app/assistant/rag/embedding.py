@@ -1,50 +1,136 @@
 # backend/app/assistant/rag/embedding.py
-import ollama
 from flask import current_app
 import logging
 import time
+import threading
+from ..cache import TTLCache, canonical_key
+from ..llm_interface import get_ollama_client, backoff_delay, is_permanent_error, is_transient_error # Shared client/connection pool and retry policy
 
 logger = logging.getLogger(__name__)
 
-# Consider adding retry logic for Ollama calls
-MAX_RETRIES = 2
-RETRY_DELAY = 1 # seconds
+# Retry logic for Ollama calls (full-jitter exponential backoff between attempts)
+MAX_RETRIES = 3 # Total attempts per embedding request
+RETRY_DELAY = 0.5 # seconds; base of the backoff window, doubled after each failed attempt
+MAX_RETRY_DELAY = 4 # seconds; upper bound of the backoff window
+
+# Small in-process cache so identical texts (e.g. a re-sent user query) skip the Ollama round-trip
+EMBEDDING_CACHE_SIZE = 256
+EMBEDDING_CACHE_TTL = 300 # seconds
+_embedding_cache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+# --- Circuit breaker: fail fast while Ollama embeddings keep failing ---
+# State is kept per (host, model), so failures with one model don't block calls for another.
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failed calls before the circuit opens
+CIRCUIT_BASE_BACKOFF = 1 # seconds; doubles each time the circuit re-opens
+CIRCUIT_MAX_BACKOFF = 30 # seconds
+_circuits = {} # {(host, model): {'consecutive_failures', 'open_until', 'backoff'}}
+_circuit_lock = threading.Lock()
+
+def _circuit_allows_call(key):
+    """
+    False while the circuit for key is open. Once the open period has passed, exactly one
+    caller is let through as the half-open probe; the others keep failing fast until it reports back.
+    """
+    with _circuit_lock:
+        state = _circuits.get(key)
+        if state is None or state['consecutive_failures'] < CIRCUIT_FAILURE_THRESHOLD:
+            return True
+        now = time.monotonic()
+        if now < state['open_until']:
+            return False
+        # Hand out the probe: push open_until forward so concurrent callers don't probe too
+        state['open_until'] = now + state['backoff']
+        return True
+
+def _record_embedding_success(key):
+    """Closes the circuit for key after a successful call (including a half-open probe)."""
+    with _circuit_lock:
+        _circuits.pop(key, None)
+
+def _record_embedding_failure(key):
+    """Counts a failed call for key and opens its circuit once the threshold is reached."""
+    with _circuit_lock:
+        state = _circuits.setdefault(key, {'consecutive_failures': 0, 'open_until': 0.0, 'backoff': CIRCUIT_BASE_BACKOFF})
+        state['consecutive_failures'] += 1
+        if state['consecutive_failures'] >= CIRCUIT_FAILURE_THRESHOLD:
+            # Past the threshold every failure (i.e. a failed half-open probe) re-opens with a longer backoff
+            state['open_until'] = time.monotonic() + state['backoff']
+            logger.warning("Embedding circuit for %s opened for %ss after %d consecutive failures.", key, state['backoff'], state['consecutive_failures'])
+            state['backoff'] = min(state['backoff'] * 2, CIRCUIT_MAX_BACKOFF)
+
+def reset_circuit():
+    """Manually closes all embedding circuit breakers (e.g. after fixing the Ollama setup)."""
+    with _circuit_lock:
+        _circuits.clear()
+    logger.info("Embedding circuit breakers reset.")
 
 def get_embedding(text: str, model: str = None):
     """
     Generates embedding for the given text using Ollama.
-    Includes basic validation and retry logic.
+    Includes basic validation, retries (for transient failures and malformed responses only)
+    and a short-lived in-memory cache.
+    Raises ConnectionError without calling Ollama while the circuit breaker is open
+    (only transport/5xx failures count towards it; 4xx errors are re-raised as-is).
     """
     if not text or not isinstance(text, str) or not text.strip():
         logger.warning("Attempted to embed empty or non-string text.")
         # Return None or raise error based on how vector_store handles it
         return None
 
-    client = ollama.Client(host=current_app.config['OLLAMA_URL'])
     embedding_model = model or current_app.config['OLLAMA_EMBEDDING_MODEL']
+    cache_key = canonical_key(embedding_model, text.strip())
+    cached = _embedding_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Embedding cache hit for model '%s'", embedding_model)
+        return list(cached) # Copy so callers can't mutate the cached embedding
+
+    ollama_url = current_app.config['OLLAMA_URL']
+    circuit_key = (ollama_url, embedding_model)
+    if not _circuit_allows_call(circuit_key):
+        logger.warning("Embedding circuit is open for model '%s'; skipping Ollama call.", embedding_model)
+        raise ConnectionError("Embedding service temporarily unavailable (circuit open).")
+
+    client = get_ollama_client(ollama_url, current_app.config['OLLAMA_TIMEOUT'])
     attempt = 0
 
     while attempt < MAX_RETRIES:
         try:
-            logger.debug(f"Attempt {attempt + 1}: Generating embedding with model '{embedding_model}' for text starting with: {text[:50]}...")
-            response = client.embeddings(model=embedding_model, prompt=text.strip()) # Ensure text is stripped
+            logger.debug("Attempt %d: Generating embedding with model '%s' for text starting with: %.50s...", attempt + 1, embedding_model, text)
+            response = client.embeddings(model=embedding_model, prompt=text.strip(), # Ensure text is stripped
+                                         keep_alive=current_app.config.get('OLLAMA_KEEP_ALIVE'))
             # Validate response structure
             if isinstance(response, dict) and 'embedding' in response and isinstance(response['embedding'], list):
-                logger.debug(f"Successfully generated embedding (dimension: {len(response['embedding'])})")
+                logger.debug("Successfully generated embedding (dimension: %d)", len(response['embedding']))
+                _record_embedding_success(circuit_key)
+                _embedding_cache.set(cache_key, list(response['embedding'])) # Cache a copy; the caller gets the original
                 return response['embedding']
             else:
-                logger.warning(f"Received unexpected embedding response format: {response}")
+                logger.warning("Received unexpected embedding response format: %s", response)
                 # Treat unexpected format as an error for retry purposes
                 raise ValueError("Invalid embedding response format")
 
         except Exception as e:
-            logger.warning(f"Attempt {attempt + 1} failed to get embedding from Ollama ({embedding_model}): {e}")
+            if is_permanent_error(e):
+                # e.g. embedding model not pulled: retrying can't help, surface the status right away
+                logger.error("Ollama rejected embedding request for model '%s' (status %s): %s", embedding_model, e.status_code, e)
+                # Ollama answered, so this isn't an availability problem: don't let it open the circuit
+                # (callers would then get a generic ConnectionError instead of this status)
+                _record_embedding_success(circuit_key)
+                raise
+            if not (is_transient_error(e) or isinstance(e, ValueError)):
+                # e.g. a read timeout: a retry would most likely hang just as long (same policy as chat calls)
+                logger.error("Embedding request to Ollama failed for model '%s' (not retried): %s", embedding_model, e, exc_info=True)
+                _record_embedding_failure(circuit_key)
+                raise
+            logger.warning("Attempt %d failed to get embedding from Ollama (%s): %s", attempt + 1, embedding_model, e)
             attempt += 1
             if attempt < MAX_RETRIES:
-                logger.info(f"Retrying embedding generation in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
+                delay = backoff_delay(attempt - 1, RETRY_DELAY, MAX_RETRY_DELAY)
+                logger.info("Retrying embedding generation in %.2f seconds...", delay)
+                time.sleep(delay)
             else:
-                logger.error(f"Failed to get embedding after {MAX_RETRIES} attempts.", exc_info=True)
+                logger.error("Failed to get embedding after %d attempts.", MAX_RETRIES, exc_info=True)
+                _record_embedding_failure(circuit_key)
                 raise # Re-raise the final exception to be handled upstream
 
     # Should not be reached if MAX_RETRIES > 0, but as a fallback
@@ -17,7 +17,7 @@ def retrieve_context(query: str, top_k: int = 3, filter_dict: dict = None):
     Returns:
         list[str]: A list of relevant document text chunks, or an empty list if none found or on error.
     """
-    logger.info(f"Retrieving context for query: '{query[:100]}...' (top_k={top_k}, filter={filter_dict})")
+    logger.info("Retrieving context for query: '%.100s...' (top_k=%s, filter=%s)", query, top_k, filter_dict)
     if not query or not query.strip():
         logger.warning("Attempted context retrieval with empty query.")
         return []
@@ -29,11 +29,11 @@ def retrieve_context(query: str, top_k: int = 3, filter_dict: dict = None):
             logger.info("No relevant context found in vector store for this query.")
             return []
 
-        logger.info(f"Retrieved {len(results)} context chunks.")
+        logger.info("Retrieved %d context chunks.", len(results))
         # results should already be a list of document strings based on search_similar
         return results
 
     except Exception as e:
         # Log the error including the query for better debugging
-        logger.error(f"Error during context retrieval for query '{query[:100]}...': {e}", exc_info=True)
+        logger.error("Error during context retrieval for query '%.100s...': %s", query, e, exc_info=True)
         return [] # Return empty list on error
@@ -1,59 +1,106 @@
 # backend/app/assistant/rag/vector_store.py
-import chromadb
+# chromadb is imported lazily via _chromadb(): it pulls in a large dependency tree, and this module
+# is imported whenever the app is created (including manage.py commands that never touch RAG).
 # Ensure chromadb is installed (add to requirements.txt)
 # from chromadb.utils import embedding_functions # Not using built-in EF for Ollama directly here
-from flask import current_app, g # Use Flask's 'g' object for request context caching
+from flask import current_app
 from .embedding import get_embedding # Use our Ollama embedding function
 import logging
 import uuid
 import os
+import threading
+from ..cache import TTLCache, canonical_key
 
 logger = logging.getLogger(__name__)
 
+# --- Search Result Cache ---
+# Similarity searches are deterministic between writes, so repeated queries are served from memory.
+# The cache is cleared on every write in this process; the TTL bounds staleness from other workers.
+SEARCH_CACHE_SIZE = 128
+SEARCH_CACHE_TTL = 60 # seconds
+_search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+def clear_search_cache():
+    """Drops all cached search results (called after any write to the collection)."""
+    _search_cache.clear()
+
 # --- ChromaDB Client and Collection Management ---
 
+# One process-wide PersistentClient per database path; opening it loads the on-disk index,
+# so it is reused across requests instead of being recreated in every request context.
+# Collection handles are cached the same way, keyed by (path, collection name).
+_chroma_clients = {}
+_chroma_collections = {}
+_chroma_clients_lock = threading.Lock()
+
+def _chromadb():
+    """Imports chromadb on first use (later calls are a cheap sys.modules lookup)."""
+    import chromadb
+    return chromadb
+
 def get_chroma_client():
-    """Gets a ChromaDB client instance, caching it in Flask's request context 'g'."""
-    if 'chroma_client' not in g:
-        try:
-            db_path = current_app.config['VECTOR_DB_PATH']
-            # Ensure the directory exists
-            os.makedirs(db_path, exist_ok=True)
-            logger.info(f"Initializing ChromaDB PersistentClient at path: {db_path}")
-            g.chroma_client = chromadb.PersistentClient(path=db_path)
-        except Exception as e:
-            logger.error(f"Failed to initialize ChromaDB client: {e}", exc_info=True)
-            raise RuntimeError("Could not connect to vector database.") from e
-    return g.chroma_client
+    """Returns the shared ChromaDB client for the configured VECTOR_DB_PATH, creating it on first use."""
+    db_path = current_app.config['VECTOR_DB_PATH']
+    client = _chroma_clients.get(db_path)
+    if client is None:
+        with _chroma_clients_lock:
+            client = _chroma_clients.get(db_path)
+            if client is None:
+                try:
+                    # Ensure the directory exists
+                    os.makedirs(db_path, exist_ok=True)
+                    logger.info("Initializing ChromaDB PersistentClient at path: %s", db_path)
+                    client = _chromadb().PersistentClient(path=db_path)
+                except Exception as e:
+                    logger.error("Failed to initialize ChromaDB client: %s", e, exc_info=True)
+                    raise RuntimeError("Could not connect to vector database.") from e
+                _chroma_clients[db_path] = client
+    return client
 
 def get_vector_db_collection():
     """
-    Initializes and returns the ChromaDB collection, caching it in Flask's 'g'.
-    Uses the client from get_chroma_client().
+    Initializes and returns the ChromaDB collection, caching the handle process-wide
+    (keyed by database path and collection name). Uses the client from get_chroma_client().
     """
-    if 'chroma_collection' not in g:
+    db_path = current_app.config['VECTOR_DB_PATH']
+    collection_name = current_app.config['VECTOR_DB_COLLECTION']
+    key = (db_path, collection_name)
+    collection = _chroma_collections.get(key)
+    if collection is None:
         client = get_chroma_client()
-        collection_name = current_app.config['VECTOR_DB_COLLECTION']
-        try:
-            logger.info(f"Getting or creating ChromaDB collection: {collection_name}")
-            # Note: We are NOT specifying an embedding_function here because we'll
-            # generate embeddings manually using our get_embedding function before adding/querying.
-            # This gives more control over the embedding process (e.g., retries).
-            g.chroma_collection = client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"} # Specify distance metric (cosine is common for embeddings)
-            )
-            logger.info(f"Vector DB Collection '{collection_name}' ready.")
-        except Exception as e:
-            logger.error(f"Failed to get or create ChromaDB collection '{collection_name}': {e}", exc_info=True)
-            raise RuntimeError(f"Could not get or create vector collection '{collection_name}'.") from e
-    return g.chroma_collection
+        with _chroma_clients_lock:
+            collection = _chroma_collections.get(key)
+            if collection is None:
+                try:
+                    logger.info("Getting or creating ChromaDB collection: %s", collection_name)
+                    # Note: We are NOT specifying an embedding_function here because we'll
+                    # generate embeddings manually using our get_embedding function before adding/querying.
+                    # This gives more control over the embedding process (e.g., retries).
+                    collection = client.get_or_create_collection(
+                        name=collection_name,
+                        metadata={"hnsw:space": "cosine"} # Specify distance metric (cosine is common for embeddings)
+                    )
+                    logger.info("Vector DB Collection '%s' ready.", collection_name)
+                except Exception as e:
+                    logger.error("Failed to get or create ChromaDB collection '%s': %s", collection_name, e, exc_info=True)
+                    raise RuntimeError(f"Could not get or create vector collection '{collection_name}'.") from e
+                _chroma_collections[key] = collection
+    return collection
 
 # --- Document Operations ---
 
-def add_document(text: str, metadata: dict = None, doc_id: str = None):
+# Maximum number of chunks written per collection.add call in add_documents
+ADD_BATCH_SIZE = 100
+
+def _as_embedding_list(embedding):
+    """Converts a numpy embedding row to a plain list (chromadb only accepts lists per embedding)."""
+    return embedding.tolist() if hasattr(embedding, 'tolist') else embedding
+
+def add_document(text: str, metadata: dict = None, doc_id: str = None, embedding=None):
     """
     Adds a document chunk to the vector store after generating its embedding.
+    A precomputed embedding (from the same embedding model; a list or 1-D numpy array)
+    can be passed to skip the Ollama call.
     """
     collection = get_vector_db_collection()
     if not text or not text.strip():
@@ -65,38 +112,122 @@ def add_document(text: str, metadata: dict = None, doc_id: str = None):
     metadata['source'] = metadata.get('source', 'unknown') # Ensure source is present
 
     try:
-        # 1. Generate embedding first
-        embedding = get_embedding(text.strip())
+        # 1. Generate embedding first (unless the caller already has one)
+        if embedding is None:
+            embedding = get_embedding(text.strip())
         if embedding is None:
-             logger.error(f"Failed to generate embedding for doc_id {doc_id}, cannot add to store.")
+             logger.error("Failed to generate embedding for doc_id %s, cannot add to store.", doc_id)
              return None # Or raise an error
 
         # 2. Add to ChromaDB collection
         collection.add(
             ids=[doc_id],
-            embeddings=[embedding], # Provide pre-generated embedding
+            embeddings=[_as_embedding_list(embedding)], # Provide pre-generated embedding
             documents=[text.strip()],
             metadatas=[metadata]
         )
-        logger.info(f"Added document with ID: {doc_id} (Source: {metadata['source']})")
+        clear_search_cache()
+        logger.info("Added document with ID: %s (Source: %s)", doc_id, metadata['source'])
         return doc_id
-    except chromadb.errors.IDAlreadyExistsError:
-         logger.warning(f"Document with ID {doc_id} already exists. Skipping addition.")
+    except _chromadb().errors.IDAlreadyExistsError:
+         logger.warning("Document with ID %s already exists. Skipping addition.", doc_id)
          # Optionally implement update logic here using collection.update()
          return doc_id # Return existing ID
     except Exception as e:
-        logger.error(f"Failed to add document ID {doc_id} to vector store: {e}", exc_info=True)
+        logger.error("Failed to add document ID %s to vector store: %s", doc_id, e, exc_info=True)
         return None
 
+def _max_add_batch_size():
+    """Batch size for add_documents writes, capped by the client's own limit where chromadb reports one."""
+    # chromadb exposes the limit as the client's max_batch_size property (absent on some backends)
+    client_limit = getattr(get_chroma_client(), 'max_batch_size', None)
+    return min(ADD_BATCH_SIZE, client_limit) if client_limit else ADD_BATCH_SIZE
+
+def add_documents(texts: list, metadatas: list = None, doc_ids: list = None, embeddings=None):
+    """
+    Adds several document chunks to the vector store, writing them in batches of up to ADD_BATCH_SIZE.
+    Embeddings are generated per chunk (reusing get_embedding's cache and retries) unless precomputed
+    ones are passed in `embeddings`, as a list (None entries are still generated) or a 2-D numpy array;
+    chunks that are empty or fail to embed are skipped, as are batches whose write fails.
+    Returns the list of IDs that were added.
+    """
+    if not texts:
+        return []
+    collection = get_vector_db_collection()
+    # `is None` rather than `or`, so a numpy array of embeddings isn't truth-tested
+    if metadatas is None:
+        metadatas = [None] * len(texts)
+    if doc_ids is None:
+        doc_ids = [None] * len(texts)
+    if embeddings is None:
+        embeddings = [None] * len(texts)
+    if len(metadatas) != len(texts) or len(doc_ids) != len(texts) or len(embeddings) != len(texts):
+        raise ValueError("texts, metadatas, doc_ids and embeddings must have the same length.")
+
+    batch_ids, batch_embeddings, batch_documents, batch_metadatas = [], [], [], []
+    for text, metadata, doc_id, embedding in zip(texts, metadatas, doc_ids, embeddings):
+        if not text or not text.strip():
+            logger.warning("Skipping empty document in batch.")
+            continue
+        doc_id = doc_id or str(uuid.uuid4())
+        metadata = dict(metadata or {})
+        metadata['source'] = metadata.get('source', 'unknown') # Ensure source is present
+
+        if embedding is None:
+            try:
+                embedding = get_embedding(text.strip())
+            except Exception as e:
+                logger.error("Failed to generate embedding for doc_id %s: %s", doc_id, e)
+        if embedding is None:
+            logger.error("Skipping doc_id %s in batch (no embedding).", doc_id)
+            continue
+
+        batch_ids.append(doc_id)
+        batch_embeddings.append(_as_embedding_list(embedding))
+        batch_documents.append(text.strip())
+        batch_metadatas.append(metadata)
+
+    if not batch_ids:
+        return []
+
+    # Write in bounded slices so a failed write only loses its own slice (and stays under Chroma's limit)
+    batch_size = _max_add_batch_size()
+    added_ids = []
+    for start in range(0, len(batch_ids), batch_size):
+        end = start + batch_size
+        try:
+            collection.add(
+                ids=batch_ids[start:end],
+                embeddings=batch_embeddings[start:end],
+                documents=batch_documents[start:end],
+                metadatas=batch_metadatas[start:end]
+            )
+            added_ids.extend(batch_ids[start:end])
+        except Exception as e:
+            logger.error("Failed to add documents %d-%d of batch to vector store: %s", start, min(end, len(batch_ids)) - 1, e, exc_info=True)
+
+    if added_ids:
+        clear_search_cache()
+    logger.info("Added %d of %d documents in batches of up to %d.", len(added_ids), len(batch_ids), batch_size)
+    return added_ids
+
 def search_similar(query_text: str, top_k: int = 3, where_filter: dict = None):
     """
     Searches for documents similar to the query text using its embedding.
-    Returns only the document texts.
+    Returns only the document texts. Results are cached briefly (see SEARCH_CACHE_TTL).
     """
-    collection = get_vector_db_collection()
     if not query_text or not query_text.strip():
         logger.warning("Attempted search with empty query.")
         return []
+    if not isinstance(top_k, int) or top_k <= 0:
+        return [] # Nothing (valid) requested; skip the embedding call and the query
+    collection = get_vector_db_collection()
+    # Keyed by store path as well as collection name, matching the client/collection caches
+    cache_key = canonical_key(current_app.config['VECTOR_DB_PATH'], collection.name, query_text.strip(), top_k, where_filter)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Vector search cache hit for query: '%.50s...'", query_text)
+        return list(cached) # Copy so callers can't mutate the cached result
     try:
         # 1. Generate query embedding
         query_embedding = get_embedding(query_text.strip())
@@ -105,7 +236,7 @@ def search_similar(query_text: str, top_k: int = 3, where_filter: dict = None):
             return []
 
         # 2. Query the collection
-        logger.debug(f"Querying collection '{collection.name}' with top_k={top_k}, filter={where_filter}")
+        logger.debug("Querying collection '%s' with top_k=%s, filter=%s", collection.name, top_k, where_filter)
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
@@ -117,13 +248,14 @@ def search_similar(query_text: str, top_k: int = 3, where_filter: dict = None):
         docs = results.get('documents', [[]])[0]
         # metadatas = results.get('metadatas', [[]])[0]
         # distances = results.get('distances', [[]])[0]
-        logger.debug(f"Vector search found {len(docs)} results for query: '{query_text[:50]}...'")
-        # logger.debug(f"Distances: {distances}") # Log distances for relevance check
+        logger.debug("Vector search found %d results for query: '%.50s...'", len(docs), query_text)
+        # logger.debug("Distances: %s", distances) # Log distances for relevance check
 
+        _search_cache.set(cache_key, list(docs))
         return docs # Return only the document text for simplicity
 
     except Exception as e:
-        logger.error(f"Failed during vector search: {e}", exc_info=True)
+        logger.error("Failed during vector search: %s", e, exc_info=True)
         return []
 
 # --- Optional: Utility functions ---
@@ -133,7 +265,7 @@ def count_documents():
         collection = get_vector_db_collection()
         return collection.count()
     except Exception as e:
-        logger.error(f"Failed to count documents: {e}", exc_info=True)
+        logger.error("Failed to count documents: %s", e, exc_info=True)
         return -1 # Indicate error
 
 def delete_document(doc_id: str):
@@ -141,8 +273,9 @@ def delete_document(doc_id: str):
     try:
         collection = get_vector_db_collection()
         collection.delete(ids=[doc_id])
-        logger.info(f"Deleted document with ID: {doc_id}")
+        clear_search_cache()
+        logger.info("Deleted document with ID: %s", doc_id)
         return True
     except Exception as e:
-        logger.error(f"Failed to delete document ID {doc_id}: {e}", exc_info=True)
+        logger.error("Failed to delete document ID %s: %s", doc_id, e, exc_info=True)
         return False
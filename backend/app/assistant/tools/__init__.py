@@ -16,6 +16,14 @@ try:
 except Exception as e:
     logger.error(f"Failed to initialize one or more tools: {e}", exc_info=True)
 
+# The registry is fixed after import, so build the name list and prompt-facing description
+# once instead of re-reading the registry on each chat request.
+_tool_names = tuple(_tools.keys())
+if _tools:
+    _tool_descriptions = "\n".join([f"- {name}: {tool.description}" for name, tool in _tools.items() if hasattr(tool, 'description')])
+else:
+    _tool_descriptions = "No tools available."
+
 
 def get_tool(name: str):
     """Retrieves an instantiated tool by name."""
@@ -25,11 +33,9 @@ def get_tool(name: str):
     return tool
 
 def get_available_tools_list():
-    """Returns a list of available tool names."""
-    return list(_tools.keys())
+    """Returns the available tool names as a cached, immutable tuple."""
+    return _tool_names
 
 def get_tool_descriptions():
-    """Returns a formatted string of tool names and descriptions."""
-    if not _tools:
-        return "No tools available."
-    return "\n".join([f"- {name}: {tool.description}" for name, tool in _tools.items() if hasattr(tool, 'description')])
+    """Returns a formatted string of tool names and descriptions (precomputed at import)."""
+    return _tool_descriptions
@@ -9,10 +9,26 @@ except ImportError:
     print("Please install it: pip install duckduckgo-search")
 
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+DDGS_TIMEOUT = 10 # seconds
+
 class WebSearchTool(BaseTool):
+    def __init__(self):
+        # One DDGS client per worker thread, so its HTTP connection is reused between searches.
+        # The tool instance is shared by all requests (Werkzeug serves each on its own thread),
+        # so clients live in thread-local storage rather than on the instance, and no lock is needed.
+        self._local = threading.local()
+
+    def _get_ddgs(self):
+        """Returns this thread's DDGS client, creating it on first use."""
+        ddgs = getattr(self._local, 'ddgs', None)
+        if ddgs is None:
+            ddgs = self._local.ddgs = DDGS(timeout=DDGS_TIMEOUT)
+        return ddgs
+
     @property
     def name(self) -> str:
         return "web_search"
@@ -34,10 +50,12 @@ class WebSearchTool(BaseTool):
             return "Error: No search query provided."
 
         try:
-            # Use context manager for DDGS
-            with DDGS(timeout=10) as ddgs: # Add a timeout
-                # Fetch text results
-                results = list(ddgs.text(query, max_results=max_results))
+            try:
+                # Fetch text results with this thread's reused client
+                results = list(self._get_ddgs().text(query, max_results=max_results))
+            except Exception:
+                self._local.ddgs = None # Don't reuse a client that may be in a bad state
+                raise
 
             if not results:
                 return f"No web search results found for '{query}'."
@@ -7,6 +7,32 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 dotenv_path = os.path.join(basedir, '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
+def parse_keep_alive(value):
+    """
+    Converts an OLLAMA_KEEP_ALIVE env value for Ollama's keep_alive parameter.
+    Plain numbers (e.g. '-1', '3600') become int/float seconds; strings sent as-is
+    must be Go durations with a unit (e.g. '30m', '-1m'), or Ollama rejects the request.
+    """
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def parse_timeout(value):
+    """
+    Converts an OLLAMA_TIMEOUT env value to seconds; unset, empty or 0 means no timeout (None).
+    """
+    if not value:
+        return None
+    seconds = float(value)
+    return seconds if seconds > 0 else None
+
 class Config:
     # It's better practice to require SECRET_KEY from env, not provide a weak default
     SECRET_KEY = os.environ.get('SECRET_KEY')
@@ -25,6 +51,19 @@ class Config:
     OLLAMA_DEFAULT_MODEL = os.environ.get('OLLAMA_DEFAULT_MODEL') or 'llama3:8b'
     # Default embedding model
     OLLAMA_EMBEDDING_MODEL = os.environ.get('OLLAMA_EMBEDDING_MODEL') or 'nomic-embed-text'
+    # Timeout (seconds) for each Ollama read/write, e.g. waiting for a non-streamed reply or the first token.
+    # Unset/0 = no limit (the default), since model loads and long CPU generations can legitimately take minutes
+    # and read timeouts aren't retried. Connecting to Ollama is always bounded (OLLAMA_CONNECT_TIMEOUT).
+    OLLAMA_TIMEOUT = parse_timeout(os.environ.get('OLLAMA_TIMEOUT'))
+    # How long Ollama keeps models loaded after a request: a duration with a unit (e.g. '30m', '-1m' = forever)
+    # or plain seconds (e.g. '3600', '-1' = forever; sent as a number). Unset = server default of 5m.
+    # A resident model also keeps the KV cache for the shared system-prompt prefix warm between turns.
+    OLLAMA_KEEP_ALIVE = parse_keep_alive(os.environ.get('OLLAMA_KEEP_ALIVE'))
+    # Load the chat model into Ollama in the background when the server handles its first request,
+    # so the first chat isn't slow (works with flask run, python run.py and WSGI servers; CLI commands never load it)
+    OLLAMA_WARMUP = os.environ.get('OLLAMA_WARMUP', 'false').lower() in ('1', 'true', 'yes')
+    # Seconds to reuse a non-streamed LLM response for an identical model + messages request (0 disables)
+    LLM_RESPONSE_CACHE_TTL = float(os.environ.get('LLM_RESPONSE_CACHE_TTL') or 0)
 
     # --- RAG Config ---
     # Path for ChromaDB persistent storage